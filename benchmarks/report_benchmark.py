@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Benchmark QC report generation (plots and PDF) against the cgeqc 1.2.0 way of
+rendering: packaged assets, logo/stylesheet/template loaded on every render
+and 300 dpi plots. The legacy run uses the current plotting code at 300 dpi,
+so plotting speedups beyond the resolution change are not counted and the
+reported ratios are a lower bound.
+
+Usage: python benchmarks/report_benchmark.py [-o OUTPUT_DIR] [-r REPEATS]
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from jinja2 import Environment, FileSystemLoader
+from weasyprint import HTML, CSS
+
+from cgeqc.qc_config import KMA_DEFAULTS, REPORT_PLOT_DPI
+from cgeqc.qc_report import calculate_qc_metrics, generate_qc_plots, render_qc_report
+from cgeqc.report_assets import load_report_assets, PACKAGE_ASSETS_DIR
+
+# Reduction in both report size and generation time the prepared pipeline should reach
+TARGET_RATIO = 3.0
+
+def synthetic_qc_data(seed=1):
+    """Build a KMA trim style QC json with realistic ONT distributions."""
+    rng = np.random.default_rng(seed)
+    resolution = 100
+    lengths = rng.lognormal(mean=8.3, sigma=0.7, size=200_000).astype(int)
+    length_dist = np.bincount(lengths // resolution).tolist()
+    q_dist = np.bincount(np.clip(rng.normal(16, 3, size=200_000), 0, 40).astype(int), minlength=41).tolist()
+    bp_count = int(lengths.sum())
+    return {
+        'Org. Fragment Count': 220_000,
+        'Fragment Count': 200_000,
+        'Org. Bp Count': int(bp_count * 1.05),
+        'Bp Count': bp_count,
+        'Org. Mean Read Length': float(lengths.mean() * 0.95),
+        'Mean Read Length': float(lengths.mean()),
+        'N50': int(np.median(lengths) * 1.4),
+        'E(Q)': 16.2,
+        'GC Content': 0.51,
+        'Q Distribution': q_dist,
+        'Length Resolution': resolution,
+        'Length Distribution': length_dist,
+    }
+
+def render_legacy_report(metrics, plots, output_dir, name, trim_parameters):
+    """Render the report as cgeqc 1.2.0 did, loading all assets on every call."""
+    env = Environment(
+        loader=FileSystemLoader(Path(PACKAGE_ASSETS_DIR).parent / "templates"),
+        autoescape=True
+    )
+    with open(PACKAGE_ASSETS_DIR / "dtu_logo.png", "rb") as f:
+        logo_data = f'data:image/png;base64,{base64.b64encode(f.read()).decode("utf-8")}'
+
+    html_content = env.get_template("qc_report.html").render(
+        name=name,
+        metrics=metrics,
+        plots=plots,
+        logo_data_url=logo_data,
+        pipeline_type=metrics.get('dataset_type', 'bacterial'),
+        trim_parameters=trim_parameters
+    )
+    pdf_path = Path(output_dir) / f"{name}_qc_report.pdf"
+    HTML(string=html_content).write_pdf(
+        pdf_path,
+        stylesheets=[CSS(PACKAGE_ASSETS_DIR / "style.css")]
+    )
+    return pdf_path
+
+def run(qc_data, output_dir, name, legacy, repeats):
+    metrics = calculate_qc_metrics(qc_data, "bacterial")
+    times = []
+    for _ in range(repeats):
+        # Each CLI run is a new process, so include loading the prepared assets
+        load_report_assets.cache_clear()
+        start = time.perf_counter()
+        if legacy:
+            plots = generate_qc_plots(qc_data, dpi=300)
+            pdf_path = render_legacy_report(metrics, plots, output_dir, name, dict(KMA_DEFAULTS))
+        else:
+            plots = generate_qc_plots(qc_data, dpi=REPORT_PLOT_DPI)
+            pdf_path = render_qc_report(metrics, plots, output_dir, name, dict(KMA_DEFAULTS))
+        times.append(time.perf_counter() - start)
+    return os.path.getsize(pdf_path), min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark QC report rendering")
+    parser.add_argument("-o", "--output", default=None, help="Output directory for benchmark reports")
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="Number of renders per configuration")
+    args = parser.parse_args()
+
+    output_dir = args.output or tempfile.mkdtemp(prefix="cgeqc_bench_")
+    os.makedirs(output_dir, exist_ok=True)
+    qc_data = synthetic_qc_data()
+
+    legacy_size, legacy_time = run(qc_data, output_dir, "legacy", True, args.repeats)
+    prepared_size, prepared_time = run(qc_data, output_dir, "prepared", False, args.repeats)
+    size_ratio = legacy_size / prepared_size
+    time_ratio = legacy_time / prepared_time
+
+    print(f"{'':<10}{'size (MB)':>12}{'time (s)':>12}")
+    print(f"{'legacy':<10}{legacy_size / 1e6:>12.2f}{legacy_time:>12.2f}")
+    print(f"{'prepared':<10}{prepared_size / 1e6:>12.2f}{prepared_time:>12.2f}")
+    print(f"Size reduction: {size_ratio:.1f}x (target {TARGET_RATIO:.0f}x: {'met' if size_ratio >= TARGET_RATIO else 'NOT met'})")
+    print(f"Speedup: {time_ratio:.1f}x (target {TARGET_RATIO:.0f}x: {'met' if time_ratio >= TARGET_RATIO else 'NOT met'})")
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,13 @@ QC_THRESHOLDS = {
     "GC_CONTENT": {
         "min": 25, # bacterial genome range: 25 - 75%
         "max": 75
+    },
+    "GC_DISTRIBUTION": {
+        "min_peak_fraction": 0.1,  # Secondary per-read GC peaks must reach 10% of the main peak
+        "min_peak_separation": 8,  # Peaks closer than 8% GC are considered the same organism
+        # Only reads >= 100 bp are used for peak finding. The GC% of shorter reads
+        # falls in coarse steps (5% for 20 bp reads) that show up as false peaks
+        "min_read_length": 100,
     }
 }
 
@@ -100,6 +107,10 @@ METAGENOMIC_TRIM_DEFAULTS = {
     "trim_3_prime": 0
 }
 
+# Resolution of plots embedded in the QC report. 150 dpi is sharp in print
+# while keeping the PDF a fraction of the size of 300 dpi plots
+REPORT_PLOT_DPI = 150
+
 # For backward compatibility
 TRIM_DEFAULTS = KMA_DEFAULTS
 
@@ -1,17 +1,22 @@
 import json
 import os
+import time
+from functools import lru_cache
 from pathlib import Path
 import base64
 from io import BytesIO
 import numpy as np
 import matplotlib.pyplot as plt
-from weasyprint import HTML, CSS
+from matplotlib.colors import LogNorm
+from weasyprint import HTML
 from jinja2 import Environment, FileSystemLoader
 from scipy.stats import norm, lognorm
 
-from cgeqc.qc_config import get_thresholds
+from cgeqc.qc_config import get_thresholds, REPORT_PLOT_DPI
+from cgeqc.report_assets import load_report_assets
+from cgeqc.read_stats import compute_read_distributions, find_gc_peaks, gc_distribution_for_min_length
 
-def create_qc_report(trim_json_path, output_dir, name, pipeline_type="bacterial", trim_parameters=None):
+def create_qc_report(trim_json_path, output_dir, name, pipeline_type="bacterial", trim_parameters=None, fastq_path=None):
     """Create a QC report from KMA trim output.
     
     Args:
@@ -20,22 +25,35 @@ def create_qc_report(trim_json_path, output_dir, name, pipeline_type="bacterial"
         name (str): Run name
         pipeline_type (str): Type of data (bacterial, viral, or metagenomic)
         trim_parameters (dict, optional): Parameters used for trimming
+        fastq_path (str, optional): Trimmed reads, used for per-read GC and quality distributions
     
     Returns:
         Path: Path to generated PDF report
     """
+    start_time = time.perf_counter()
+    
     # Load QC data
     with open(trim_json_path) as f:
         qc_data = json.load(f)
     
+    # Add per-read distributions
+    if fastq_path:
+        qc_data.update(compute_read_distributions(fastq_path))
+    
     # Calculate derived metrics
     metrics = calculate_qc_metrics(qc_data, pipeline_type)
     
     # Generate plots
-    plots = generate_qc_plots(qc_data)
+    plots = generate_qc_plots(qc_data, gc_peaks=metrics.get('gc_peaks'))
     
     # Create report
-    return render_qc_report(metrics, plots, output_dir, name, trim_parameters)
+    pdf_path = render_qc_report(metrics, plots, output_dir, name, trim_parameters)
+    
+    elapsed = time.perf_counter() - start_time
+    size_mb = pdf_path.stat().st_size / 1_000_000
+    print(f"QC report size: {size_mb:.2f} MB, generated in {elapsed:.2f}s")
+    
+    return pdf_path
 
 def calculate_qc_metrics(qc_data, pipeline_type="bacterial"):
     """Calculate key QC metrics and determine quality assessment."""
@@ -85,6 +103,19 @@ def calculate_qc_metrics(qc_data, pipeline_type="bacterial"):
         estimated_coverage = qc_data['Bp Count'] / TYPICAL_BACTERIAL_GENOME
         metrics['estimated_coverage'] = round(estimated_coverage, 1)
         metrics['gc_content'] = round(qc_data['GC Content'] * 100, 1)
+        if sum(qc_data.get('Read GC Distribution', [])) > 0:
+            gc_thresholds = thresholds['GC_DISTRIBUTION']
+            gc_distribution = gc_distribution_for_min_length(
+                qc_data['GC Length Distribution'],
+                qc_data['GC Length Bins'],
+                gc_thresholds['min_read_length']
+            )
+            metrics['gc_peaks'] = find_gc_peaks(
+                gc_distribution,
+                gc_thresholds['min_peak_fraction'],
+                gc_thresholds['min_peak_separation']
+            )
+            metrics['gc_multimodal'] = len(metrics['gc_peaks']) > 1
     else:
         # For viral and metagenomic, we focus on total bp count
         metrics['bp_count'] = qc_data['Bp Count']
@@ -138,6 +169,11 @@ def calculate_qc_metrics(qc_data, pipeline_type="bacterial"):
         else:
             assessment_points.append(f'GC content ({metrics["gc_content"]}%) is within expected range for bacterial genomes ({thresholds["GC_CONTENT"]["min"]}-{thresholds["GC_CONTENT"]["max"]}%)')
         
+        # Per-read GC distribution checks - a mix of organisms can average to a normal bulk GC content
+        if metrics.get('gc_multimodal'):
+            peaks = ', '.join(f'{peak:.1f}%' for peak in metrics['gc_peaks'])
+            assessment_points.append(f'The per-read GC distribution has multiple peaks ({peaks}). This suggests the sample contains more than one organism and might indicate contamination')
+        
         # Set overall assessment based on defined thresholds
         if (metrics['mean_quality'] >= thresholds['GOOD']['min_quality'] and 
             metrics['estimated_coverage'] >= thresholds['GOOD']['min_coverage']):
@@ -224,8 +260,12 @@ def calculate_percentage_change(new_value, old_value):
         return 0
     return abs(round(((new_value - old_value) / old_value) * 100, 1))
 
-def generate_qc_plots(qc_data):
-    """Generate QC plots with reference distributions."""
+def generate_qc_plots(qc_data, dpi=REPORT_PLOT_DPI, gc_peaks=None):
+    """Generate QC plots with reference distributions.
+
+    gc_peaks are the per-read GC peaks from calculate_qc_metrics, marked in the
+    per-read GC plot (None if they were not assessed).
+    """
     plots = {}
     
     # Quality score distribution
@@ -261,7 +301,7 @@ def generate_qc_plots(qc_data):
     plt.xticks(range(0, max_q + 1, tick_spacing))
     
     buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
+    plt.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
     plt.close()
     buf.seek(0)
     plots['quality_dist'] = base64.b64encode(buf.read()).decode('utf-8')
@@ -285,15 +325,15 @@ def generate_qc_plots(qc_data):
     percentile_99_idx = np.searchsorted(cumsum, 0.99 * total_reads)
     
     # Create bin edges and centers for plotting (only for the data we have)
-    bin_edges = np.array([(i * resolution, (i + 1) * resolution) for i in range(len(dist_data))])
-    bin_centers = bin_edges.mean(axis=1)
+    bin_edges = np.arange(len(dist_data) + 1) * resolution
     
-    # Plot main distribution (up to 99th percentile)
-    ax_main.bar(bin_centers[:percentile_99_idx+1], 
-                dist_data[:percentile_99_idx+1], 
-                width=resolution * 0.9,
-                color='#4a90e2', 
-                alpha=0.6)
+    # Plot main distribution (up to 99th percentile). Drawn as one filled step
+    # histogram, as a bar per bin makes plotting the slowest part of the report
+    ax_main.stairs(dist_data[:percentile_99_idx+1], 
+                   bin_edges[:percentile_99_idx+2], 
+                   fill=True,
+                   color='#4a90e2', 
+                   alpha=0.6)
     
     # Calculate and plot statistics
     mean_length = qc_data['Mean Read Length']
@@ -321,7 +361,7 @@ def generate_qc_plots(qc_data):
     
     # Create small overview plot
     ax_overview = plt.subplot2grid((3, 3), (2, 0), colspan=3)
-    ax_overview.bar(bin_centers, dist_data, width=resolution * 0.9, color='#4a90e2', alpha=0.6)
+    ax_overview.stairs(dist_data, bin_edges, fill=True, color='#4a90e2', alpha=0.6)
     ax_overview.axvline(mean_length, color='#2ecc71', linestyle='--')
     ax_overview.axvline(n50, color='#e74c3c', linestyle='--')
     ax_overview.set_xlabel('Read Length (bp)')
@@ -349,27 +389,84 @@ def generate_qc_plots(qc_data):
     plt.tight_layout()
     
     buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
+    plt.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
     plt.close()
     buf.seek(0)
     plots['length_dist'] = base64.b64encode(buf.read()).decode('utf-8')
     
+    # Per-read GC and quality distributions (only if computed from the reads)
+    if sum(qc_data.get('Read GC Distribution', [])) > 0:
+        plots['read_composition'] = generate_read_composition_plot(qc_data, dpi, gc_peaks)
+    
     return plots
 
-def render_qc_report(metrics, plots, output_dir, name, trim_parameters=None):
-    """Render the QC report using the template."""
-    package_dir = Path(__file__).parent
-    env = Environment(
-        loader=FileSystemLoader(package_dir / "templates"),
-        autoescape=True
+def generate_read_composition_plot(qc_data, dpi=REPORT_PLOT_DPI, gc_peaks=None):
+    """Plot per-read GC content, per-read mean quality and GC x read length."""
+    fig = plt.figure(figsize=(12, 10))
+    
+    # Per-read GC content
+    ax_gc = plt.subplot2grid((2, 2), (0, 0))
+    gc_dist = np.array(qc_data['Read GC Distribution'])
+    gc_centers = np.arange(len(gc_dist)) + 0.5
+    ax_gc.bar(gc_centers, gc_dist / max(gc_dist.sum(), 1), width=0.9, color='#4a90e2', alpha=0.6)
+    for i, peak in enumerate(gc_peaks or []):
+        ax_gc.axvline(peak, color='#e74c3c', linestyle='--', label='GC peaks' if i == 0 else None)
+    ax_gc.set_xlabel('GC Content (%)')
+    ax_gc.set_ylabel('Proportion of Reads')
+    ax_gc.set_title('Per-read GC Content')
+    ax_gc.set_xlim(0, 100)
+    ax_gc.grid(True, alpha=0.3)
+    if ax_gc.get_legend_handles_labels()[0]:
+        ax_gc.legend()
+    
+    # Per-read mean quality
+    ax_q = plt.subplot2grid((2, 2), (0, 1))
+    q_dist = np.array(qc_data['Read Mean Q Distribution'])
+    max_q = max((i for i, v in enumerate(q_dist) if v > 0), default=0)
+    ax_q.bar(np.arange(max_q + 1), q_dist[:max_q + 1] / max(q_dist.sum(), 1), color='#4a90e2', alpha=0.6)
+    ax_q.set_xlabel('Mean Quality Score')
+    ax_q.set_ylabel('Proportion of Reads')
+    ax_q.set_title('Per-read Mean Quality')
+    ax_q.set_xlim(-1, max_q + 1)
+    ax_q.grid(True, alpha=0.3)
+    
+    # GC content x read length
+    ax_joint = plt.subplot2grid((2, 2), (1, 0), colspan=2)
+    joint = np.array(qc_data['GC Length Distribution'], dtype=float)
+    length_edges = np.array(qc_data['GC Length Bins'])
+    length_edges = np.append(length_edges, length_edges[-1] * (length_edges[-1] / length_edges[-2]))
+    # Only show the range of read lengths present in the data
+    rows = np.nonzero(joint.sum(axis=1))[0]
+    if len(rows):
+        joint = joint[rows[0]:rows[-1] + 1]
+        length_edges = length_edges[rows[0]:rows[-1] + 2]
+    mesh = ax_joint.pcolormesh(
+        np.arange(joint.shape[1] + 1), length_edges, np.ma.masked_equal(joint, 0),
+        cmap='Blues', norm=LogNorm()
     )
+    ax_joint.set_yscale('log')
+    ax_joint.set_xlabel('GC Content (%)')
+    ax_joint.set_ylabel('Read Length (bp)')
+    ax_joint.set_title('GC Content by Read Length')
+    ax_joint.set_xlim(0, 100)
+    fig.colorbar(mesh, ax=ax_joint, label='Number of Reads')
+    
+    plt.tight_layout()
     
-    # Load logo
-    logo_path = package_dir / "assets" / "dtu_logo.png"
-    logo_data = ""
-    if logo_path.exists():
-        with open(logo_path, "rb") as f:
-            logo_data = f'data:image/png;base64,{base64.b64encode(f.read()).decode("utf-8")}'
+    buf = BytesIO()
+    plt.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close()
+    buf.seek(0)
+    return base64.b64encode(buf.read()).decode('utf-8')
+
+def render_qc_report(metrics, plots, output_dir, name, trim_parameters=None):
+    """Render the QC report using the template.
+
+    Logo and stylesheet come from the prepared asset cache (see report_assets),
+    so they are only loaded and parsed once per process.
+    """
+    env = _get_template_env()
+    assets = load_report_assets()
     
     # Ensure parameters are integers for correct template comparison
     if trim_parameters:
@@ -385,7 +482,7 @@ def render_qc_report(metrics, plots, output_dir, name, trim_parameters=None):
         name=name,
         metrics=metrics,
         plots=plots,
-        logo_data_url=logo_data,
+        logo_data_url=assets['logo_data_url'],
         pipeline_type=pipeline_type,
         trim_parameters=trim_parameters or {}  # Provide default empty dict if None
     )
@@ -394,8 +491,15 @@ def render_qc_report(metrics, plots, output_dir, name, trim_parameters=None):
     pdf_path = Path(output_dir) / f"{name}_qc_report.pdf"
     HTML(string=html_content).write_pdf(
         pdf_path,
-        stylesheets=[CSS(package_dir / "assets" / "style.css")]
+        stylesheets=[assets['stylesheet']]
     )
     
     return pdf_path
 
+@lru_cache(maxsize=None)
+def _get_template_env():
+    """Get the Jinja environment for the report templates, created once per process."""
+    return Environment(
+        loader=FileSystemLoader(Path(__file__).parent / "templates"),
+        autoescape=True
+    )
@@ -0,0 +1,179 @@
+"""
+Per-read GC content and quality distributions from a FASTQ file.
+
+The FASTQ is read in fixed-size blocks and every block is processed with
+numpy, so memory use is bounded by the block size (plus the longest read)
+regardless of the size of the input.
+"""
+import gzip
+
+import numpy as np
+from scipy.ndimage import gaussian_filter1d
+from scipy.signal import find_peaks
+
+# Size of the raw FASTQ blocks processed at once
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Histogram layout
+GC_BINS = 100  # 1% GC bins
+MEAN_Q_BINS = 60  # 1 Q bins, mean Q >= 59 goes to the last bin
+LENGTH_BINS_PER_DECADE = 10
+LENGTH_MAX_DECADE = 6  # Log10 length bins from 1 bp to 1 Mbp, longer reads go to the last bin
+LENGTH_BINS = LENGTH_BINS_PER_DECADE * LENGTH_MAX_DECADE
+
+PHRED_OFFSET = 33
+
+# Lookup tables indexed by the raw sequence/quality byte
+_GC_LUT = np.zeros(256, dtype=np.uint8)
+_GC_LUT[list(b"GCgcSs")] = 1
+_ERROR_PROB_LUT = (10.0 ** (-np.clip(np.arange(256) - PHRED_OFFSET, 0, None) / 10)).astype(np.float32)
+
+def get_length_bin_edges():
+    """Lower edges (bp) of the log10 read length bins of the joint GC x length histogram."""
+    return (10 ** (np.arange(LENGTH_BINS) / LENGTH_BINS_PER_DECADE)).tolist()
+
+def _iter_fastq_chunks(fastq_path, chunk_bytes=CHUNK_BYTES):
+    """Yield (sequences, qualities) lists for blocks of complete 4-line FASTQ records."""
+    opener = gzip.open if str(fastq_path).endswith(".gz") else open
+    with opener(fastq_path, "rb") as f:
+        remainder = b""
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            lines = (remainder + block).split(b"\n")
+            # The last line may be incomplete, keep it and any partial record for the next block
+            n_complete = (len(lines) - 1) // 4 * 4
+            remainder = b"\n".join(lines[n_complete:])
+            if n_complete:
+                yield lines[1:n_complete:4], lines[3:n_complete:4]
+
+        # Final record if the file does not end with a newline
+        lines = remainder.split(b"\n")
+        n_complete = len(lines) // 4 * 4
+        if n_complete:
+            yield lines[1:n_complete:4], lines[3:n_complete:4]
+
+def _process_chunk(seqs, quals):
+    """Get read lengths, GC% and mean Q for a block of reads.
+
+    Empty reads and records where the sequence and quality lengths differ are
+    dropped; the number of the latter is returned so it can be reported.
+    """
+    lengths = np.fromiter(map(len, seqs), dtype=np.int64, count=len(seqs))
+    qual_lengths = np.fromiter(map(len, quals), dtype=np.int64, count=len(quals))
+    malformed = lengths != qual_lengths
+    n_malformed = int(np.count_nonzero(malformed))
+    keep = ~malformed & (lengths > 0)
+    if not keep.all():
+        seqs = [s for s, k in zip(seqs, keep) if k]
+        quals = [q for q, k in zip(quals, keep) if k]
+        lengths = lengths[keep]
+    if len(lengths) == 0:
+        return None, n_malformed
+
+    seq = np.frombuffer(b"".join(seqs), dtype=np.uint8)
+    qual = np.frombuffer(b"".join(quals), dtype=np.uint8)
+
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    gc_counts = np.add.reduceat(_GC_LUT[seq], starts, dtype=np.int64)
+    error_sums = np.add.reduceat(_ERROR_PROB_LUT[qual], starts, dtype=np.float64)
+
+    gc_percent = 100 * gc_counts / lengths
+    # Mean Q is taken over error probabilities, as for the read Q scores reported by ONT basecallers
+    mean_q = -10 * np.log10(np.maximum(error_sums / lengths, 1e-10))
+    return (lengths, gc_percent, mean_q), n_malformed
+
+def compute_read_distributions(fastq_path, chunk_bytes=CHUNK_BYTES):
+    """Compute per-read GC, mean quality and joint GC x length histograms.
+
+    Args:
+        fastq_path (str): Path to a FASTQ file (optionally gzipped)
+        chunk_bytes (int): Number of bytes read and processed at once
+
+    Returns:
+        dict: Histograms in the same style as the KMA trim QC json:
+            'Read GC Distribution' (GC_BINS 1% bins),
+            'Read Mean Q Distribution' (MEAN_Q_BINS 1 Q bins),
+            'GC Length Distribution' (LENGTH_BINS rows of GC_BINS columns) and
+            'GC Length Bins' (lower edges of the length bins in bp),
+            or an empty dict if the file contains no reads
+    """
+    gc_hist = np.zeros(GC_BINS, dtype=np.int64)
+    mean_q_hist = np.zeros(MEAN_Q_BINS, dtype=np.int64)
+    joint_hist = np.zeros(LENGTH_BINS * GC_BINS, dtype=np.int64)
+
+    n_malformed = 0
+
+    for seqs, quals in _iter_fastq_chunks(fastq_path, chunk_bytes):
+        result, chunk_malformed = _process_chunk(seqs, quals)
+        n_malformed += chunk_malformed
+        if result is None:
+            continue
+        lengths, gc_percent, mean_q = result
+
+        gc_idx = np.minimum(gc_percent.astype(np.int64), GC_BINS - 1)
+        q_idx = np.minimum(mean_q.astype(np.int64), MEAN_Q_BINS - 1)
+        length_idx = np.minimum((np.log10(lengths) * LENGTH_BINS_PER_DECADE).astype(np.int64), LENGTH_BINS - 1)
+
+        gc_hist += np.bincount(gc_idx, minlength=GC_BINS)
+        mean_q_hist += np.bincount(q_idx, minlength=MEAN_Q_BINS)
+        joint_hist += np.bincount(length_idx * GC_BINS + gc_idx, minlength=LENGTH_BINS * GC_BINS)
+
+    if n_malformed:
+        print(f"WARNING: Skipped {n_malformed:,} FASTQ records in {fastq_path} with different sequence and quality lengths")
+
+    # No reads left after trimming, nothing to report
+    if gc_hist.sum() == 0:
+        return {}
+
+    return {
+        'Read GC Distribution': gc_hist.tolist(),
+        'Read Mean Q Distribution': mean_q_hist.tolist(),
+        'GC Length Distribution': joint_hist.reshape(LENGTH_BINS, GC_BINS).tolist(),
+        'GC Length Bins': get_length_bin_edges(),
+    }
+
+def gc_distribution_for_min_length(gc_length_distribution, length_bins, min_length):
+    """Sum the joint GC x length histogram over reads of at least min_length bp.
+
+    min_length is rounded up to the next length bin edge (LENGTH_BINS_PER_DECADE
+    bins per decade; 100 bp is an exact edge).
+
+    Args:
+        gc_length_distribution (list): 'GC Length Distribution' from compute_read_distributions
+        length_bins (list): 'GC Length Bins' (lower edges of the length bins in bp)
+        min_length (int): Minimum read length in bp
+
+    Returns:
+        list: Read counts per 1% GC bin
+    """
+    joint = np.asarray(gc_length_distribution, dtype=np.int64)
+    # Tolerance for the floating point bin edges
+    keep = np.asarray(length_bins) >= min_length * (1 - 1e-9)
+    return joint[keep].sum(axis=0).tolist()
+
+def find_gc_peaks(gc_distribution, min_peak_fraction=0.1, min_peak_separation=8, smoothing=1.5):
+    """Find the modes of a per-read GC distribution.
+
+    Args:
+        gc_distribution (list): Read counts per 1% GC bin
+        min_peak_fraction (float): Minimum peak height relative to the highest peak
+        min_peak_separation (int): Minimum distance between peaks in % GC
+        smoothing (float): Standard deviation (in % GC) of the Gaussian smoothing
+
+    Returns:
+        list: GC% of the peaks, ordered by GC
+    """
+    counts = np.asarray(gc_distribution, dtype=np.float64)
+    if counts.sum() == 0:
+        return []
+    smoothed = gaussian_filter1d(counts, smoothing, mode="constant")
+    # Pad so peaks at 0% or 100% GC can be detected
+    peaks, _ = find_peaks(
+        np.concatenate(([0], smoothed, [0])),
+        height=min_peak_fraction * smoothed.max(),
+        prominence=min_peak_fraction * smoothed.max(),
+        distance=min_peak_separation
+    )
+    return [int(p - 1) + 0.5 for p in peaks]
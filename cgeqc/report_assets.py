@@ -0,0 +1,178 @@
+"""
+Prepared assets for QC report rendering.
+
+The packaged report assets are much larger than what ends up visible in the
+PDF (a 5000x5000 px header pattern of which only the center third is shown,
+and a ~2800 px tall logo shown at 48px). This module prepares cropped,
+downscaled and recompressed copies together with a minified stylesheet once
+per installed version, stores them in an on-disk cache and keeps the loaded
+logo and parsed stylesheet in memory for the process.
+"""
+import base64
+import json
+import os
+import re
+import shutil
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image
+
+from cgeqc.version import __version__
+
+PACKAGE_ASSETS_DIR = Path(__file__).parent / "assets"
+
+# Target sizes for prepared assets
+LOGO_HEIGHT_PX = 192  # Logo is shown at 48px, keep 4x for print
+PATTERN_WIDTH_PX = 1100  # Cropped header pattern, ~155 dpi across the 18 cm wide header
+PATTERN_JPEG_QUALITY = 80
+
+# style.css draws the header pattern at 300% of the header width, centered, so
+# only the center third is ever visible. The prepared pattern is cropped to
+# that third and the prepared stylesheet draws it at 100% instead
+PATTERN_SIZE_RULE = re.compile(r"background-size:\s*300% auto")
+PATTERN_CROPPED_SIZE = "background-size: 100% auto"
+
+MANIFEST_NAME = "manifest.json"
+
+def get_asset_cache_dir():
+    """Get the cache directory for prepared assets of this cgeqc version.
+
+    Uses $CGEQC_CACHE_DIR if set, otherwise $XDG_CACHE_HOME/cgeqc or ~/.cache/cgeqc.
+    """
+    base_dir = os.environ.get("CGEQC_CACHE_DIR")
+    if not base_dir:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+        base_dir = os.path.join(xdg_cache, "cgeqc")
+    return Path(base_dir) / __version__ / "assets"
+
+def _source_fingerprint():
+    """Size and mtime of the packaged assets, used to invalidate the cache."""
+    fingerprint = {}
+    for name in ("dtu_logo.png", "DTU_pattern.jpg", "style.css"):
+        stat = (PACKAGE_ASSETS_DIR / name).stat()
+        fingerprint[name] = [stat.st_size, int(stat.st_mtime)]
+    return fingerprint
+
+def _prepare_logo(source, target):
+    with Image.open(source) as img:
+        if img.height > LOGO_HEIGHT_PX:
+            width = round(img.width * LOGO_HEIGHT_PX / img.height)
+            img = img.resize((width, LOGO_HEIGHT_PX), Image.LANCZOS)
+        img.save(target, format="PNG", optimize=True)
+
+def _prepare_pattern(source, target, crop=True):
+    with Image.open(source) as img:
+        img = img.convert("RGB")
+        if crop:
+            width, height = img.size
+            img = img.crop((width // 3, height // 3, width - width // 3, height - height // 3))
+        if img.width > PATTERN_WIDTH_PX:
+            img = img.resize((PATTERN_WIDTH_PX, round(img.height * PATTERN_WIDTH_PX / img.width)), Image.LANCZOS)
+        img.save(target, format="JPEG", quality=PATTERN_JPEG_QUALITY, optimize=True, progressive=True)
+
+def _minify_css(css_text):
+    """Strip comments and redundant whitespace from a stylesheet."""
+    css_text = re.sub(r"/\*.*?\*/", "", css_text, flags=re.S)
+    css_text = re.sub(r"\s+", " ", css_text)
+    css_text = re.sub(r"\s*([{};,>])\s*", r"\1", css_text)
+    return css_text.strip()
+
+def _read_manifest(manifest_path):
+    """Read the source fingerprint a cache was built from, None if there is no cache."""
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def prepare_report_assets(cache_dir=None, force=False):
+    """Prepare downscaled report assets and a minified stylesheet on disk.
+
+    Assets are only regenerated when missing, when the packaged sources change
+    or when force is set.
+
+    Args:
+        cache_dir (str, optional): Directory for prepared assets. Defaults to get_asset_cache_dir()
+        force (bool): Regenerate assets even if the cache is up to date
+
+    Returns:
+        Path: Directory containing the prepared assets
+    """
+    cache_dir = Path(cache_dir) if cache_dir else get_asset_cache_dir()
+    manifest_path = cache_dir / MANIFEST_NAME
+    fingerprint = _source_fingerprint()
+
+    if not force and _read_manifest(manifest_path) == fingerprint:
+        return cache_dir
+
+    # Build in a temporary directory and swap it in, so concurrent runs never
+    # see a half-written cache
+    tmp_dir = cache_dir.with_name(f"{cache_dir.name}.tmp{os.getpid()}")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        _prepare_logo(PACKAGE_ASSETS_DIR / "dtu_logo.png", tmp_dir / "dtu_logo.png")
+        with open(PACKAGE_ASSETS_DIR / "style.css") as f:
+            css_text = _minify_css(f.read())
+        # Only crop the pattern if the stylesheet can be adjusted to match
+        css_text, n_pattern_rules = PATTERN_SIZE_RULE.subn(PATTERN_CROPPED_SIZE, css_text)
+        _prepare_pattern(PACKAGE_ASSETS_DIR / "DTU_pattern.jpg", tmp_dir / "DTU_pattern.jpg",
+                         crop=n_pattern_rules > 0)
+        with open(tmp_dir / "style.css", "w") as f:
+            f.write(css_text)
+        with open(tmp_dir / MANIFEST_NAME, "w") as f:
+            json.dump(fingerprint, f)
+
+        # Move the old cache aside instead of deleting it in place, so the
+        # cache directory is only ever missing between two renames
+        old_dir = cache_dir.with_name(f"{cache_dir.name}.old{os.getpid()}")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        try:
+            os.replace(cache_dir, old_dir)
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(tmp_dir, cache_dir)
+        except OSError:
+            # Another process installed its cache first
+            if _read_manifest(manifest_path) != fingerprint:
+                raise
+        shutil.rmtree(old_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return cache_dir
+
+def _load_assets(assets_dir):
+    """Read the logo and parse the stylesheet from an assets directory."""
+    from weasyprint import CSS
+
+    logo_data = ""
+    logo_path = assets_dir / "dtu_logo.png"
+    if logo_path.exists():
+        with open(logo_path, "rb") as f:
+            logo_data = f'data:image/png;base64,{base64.b64encode(f.read()).decode("utf-8")}'
+
+    return {
+        'logo_data_url': logo_data,
+        'stylesheet': CSS(filename=str(assets_dir / "style.css")),
+        'assets_dir': assets_dir,
+    }
+
+@lru_cache(maxsize=None)
+def load_report_assets():
+    """Load the logo data URL and parsed stylesheet used by the report.
+
+    The result is cached for the lifetime of the process. If the prepared
+    assets cannot be written or read (e.g. read-only home directory, or the
+    cache being replaced by another process), the packaged assets are used as-is.
+
+    Returns:
+        dict: 'logo_data_url', 'stylesheet' (weasyprint CSS) and 'assets_dir'
+    """
+    try:
+        return _load_assets(prepare_report_assets())
+    except OSError as e:
+        print(f"WARNING: Could not prepare report assets, using packaged assets: {e}")
+
+    return _load_assets(PACKAGE_ASSETS_DIR)
@@ -61,7 +61,8 @@ class TrimRunner():
                     self.output_dir, 
                     self.trimmed_name,
                     self.pipeline_type,
-                    self.parameters
+                    self.parameters,
+                    fastq_path=expected_output
                 )
                 self.logger.info(f"Generated QC report: {qc_report_path}")
                 print(f"QC report generated: {qc_report_path}")
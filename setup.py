@@ -32,7 +32,8 @@ setup(
         "Jinja2>=3.1.4",
         "matplotlib>=3.9.2",
         "scipy>=1.10.0",
-        "numpy>=1.24.0"
+        "numpy>=1.24.0",
+        "Pillow>=9.1.0"
     ],
     author="Frederik Duus Møller",
     author_email="freddu@food.dtu.dk",